@@ -1,18 +1,34 @@
 """
 FastAPI server for fast transcription using faster-whisper.
 POST /v1/transcribe: multipart audio, returns transcript (optional segments).
+POST /v1/transcribe/stream: same input, streams segments back as NDJSON.
 GET /health: liveness.
+
+Run as a single process (uvicorn app.main:app, no --workers): every extra worker
+process loads its own copy of the weights, and they cannot be preloaded and
+shared across fork because CTranslate2's inference threads do not survive it.
+Transcriptions run in the threadpool; raise WHISPER_NUM_WORKERS to let one
+model decode that many requests in parallel.
 """
+import hmac
+import io
 import os
-import tempfile
 import time
 import uuid
-from pathlib import Path
 
-from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile
+import orjson
+from fastapi import FastAPI, File, Form, Header, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from app.transcribe import ALLOWED_MODELS, get_model, transcribe_file
+from app.transcribe import (
+    ALLOWED_MODELS,
+    get_model,
+    segment_dict,
+    transcribe_file,
+    transcribe_file_iter,
+)
 
 app = FastAPI(title="Transcription API", version="1.0.0")
 
@@ -20,6 +36,8 @@ app = FastAPI(title="Transcription API", version="1.0.0")
 @app.on_event("startup")
 def startup():
     """Load default model once at startup so first request is fast."""
+    # Never load the model before a fork (e.g. gunicorn --preload): CTranslate2's
+    # inference threads do not survive fork() and the child would hang.
     try:
         get_model(model_size="small")
         print("Whisper model loaded (small, default)")
@@ -28,6 +46,30 @@ def startup():
 
 TRANSCRIBE_API_KEY = os.environ.get("TRANSCRIBE_API_KEY", "")
 MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))  # 50MB
+UPLOAD_CHUNK_BYTES = 1024 * 1024  # 1MB
+# Allowance for multipart boundaries and the other form fields in Content-Length.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """
+    Reject uploads whose declared Content-Length is over the limit before the body is read.
+    FastAPI parses multipart forms before the handler runs, so this cannot live in the route.
+    Chunked uploads without Content-Length are still capped while reading (_read_upload).
+    """
+    if request.url.path.startswith("/v1/transcribe"):
+        content_length = request.headers.get("content-length")
+        if (
+            content_length
+            and content_length.isdigit()
+            and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+        ):
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"File too large (max {MAX_UPLOAD_BYTES // (1024*1024)}MB)"},
+            )
+    return await call_next(request)
 
 
 class TranscribeResponse(BaseModel):
@@ -40,10 +82,36 @@ class TranscribeResponse(BaseModel):
 def _require_api_key(x_api_key: str | None = Header(None, alias="X-API-Key")) -> None:
     if not TRANSCRIBE_API_KEY:
         raise HTTPException(status_code=500, detail="Server missing TRANSCRIBE_API_KEY")
-    if not x_api_key or x_api_key != TRANSCRIBE_API_KEY:
+    # Constant-time compare (bytes, since compare_digest rejects non-ASCII str).
+    if not x_api_key or not hmac.compare_digest(
+        x_api_key.encode(), TRANSCRIBE_API_KEY.encode()
+    ):
         raise HTTPException(status_code=401, detail="Invalid or missing X-API-Key")
 
 
+async def _read_upload(file: UploadFile, request_id: str) -> io.BytesIO:
+    """Read the upload into memory in chunks, enforcing MAX_UPLOAD_BYTES as it arrives."""
+    buf = io.BytesIO()
+    size = 0
+    while True:
+        try:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        except Exception as e:
+            print(f"[{request_id}] read error: {e}")
+            raise HTTPException(status_code=400, detail="Failed to read upload")
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large (max {MAX_UPLOAD_BYTES // (1024*1024)}MB)",
+            )
+        buf.write(chunk)
+    buf.seek(0)
+    return buf
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -70,31 +138,14 @@ async def transcribe(
     start = time.perf_counter()
 
     try:
-        content = await file.read()
-    except Exception as e:
-        print(f"[{request_id}] read error: {e}")
-        raise HTTPException(status_code=400, detail="Failed to read upload")
-
-    size = len(content)
-    if size > MAX_UPLOAD_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large (max {MAX_UPLOAD_BYTES // (1024*1024)}MB)",
-        )
-
-    suffix = Path(filename).suffix or ".bin"
-    if suffix not in (".m4a", ".mp3", ".wav", ".webm", ".ogg", ".flac", ".bin"):
-        suffix = ".bin"
-
-    tmp_path = None
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir="/tmp") as f:
-            f.write(content)
-            tmp_path = f.name
+        audio = await _read_upload(file, request_id)
+        size = audio.getbuffer().nbytes
 
         lang_param = (language or "").strip() or None
-        text, detected_lang, duration_sec, segments = transcribe_file(
-            tmp_path,
+        # In the threadpool so one process keeps serving other requests meanwhile
+        text, detected_lang, duration_sec, segments = await run_in_threadpool(
+            transcribe_file,
+            audio,
             language=lang_param,
             model_size=model,
             include_timestamps=timestamps,
@@ -111,14 +162,72 @@ async def transcribe(
             "text": text,
             "segments": segments,
         }
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[{request_id}] transcribe error: {e}")
         raise HTTPException(status_code=500, detail="Transcription failed")
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
+
+
+@app.post("/v1/transcribe/stream")
+async def transcribe_stream(
+    file: UploadFile = File(..., description="Audio file (m4a/mp3/wav)"),
+    language: str | None = Form(None, description="Language code e.g. en, or auto"),
+    model: str = Form("small", description="base|small|medium|large-v3"),
+    x_api_key: str | None = Header(None, alias="X-API-Key"),
+):
+    """
+    Stream segments as NDJSON while they are decoded: one {"start","end","text"}
+    line per segment, then {"done": true, "language", "duration_sec"}.
+    Errors after streaming has started are reported as a final {"error"} line.
+    """
+    _require_api_key(x_api_key)
+
+    if model not in ALLOWED_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"model must be one of {list(ALLOWED_MODELS)}",
+        )
+
+    request_id = str(uuid.uuid4())[:8]
+    filename = file.filename or "audio"
+    start = time.perf_counter()
+
+    audio = await _read_upload(file, request_id)
+    size = audio.getbuffer().nbytes
+    lang_param = (language or "").strip() or None
+    try:
+        # Decode, VAD and language detection run before the first segment; keep them off the event loop.
+        segments_iter, info = await run_in_threadpool(
+            transcribe_file_iter, audio, language=lang_param, model_size=model
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[{request_id}] transcribe error: {e}")
+        raise HTTPException(status_code=500, detail="Transcription failed")
+
+    # Sync generator: Starlette iterates it in a threadpool, keeping decoding off the event loop.
+    def ndjson():
+        try:
+            for s in segments_iter:
+                yield orjson.dumps(segment_dict(s)) + b"\n"
+        except Exception as e:
+            print(f"[{request_id}] transcribe error: {e}")
+            yield orjson.dumps({"error": "Transcription failed"}) + b"\n"
+            return
+        duration_sec = float(info.duration or 0.0)
+        elapsed = time.perf_counter() - start
+        print(
+            f"[{request_id}] filename={filename!r} size={size} model={model} stream=1 "
+            f"elapsed_sec={elapsed:.2f} duration_sec={duration_sec:.2f}"
+        )
+        yield orjson.dumps({
+            "done": True,
+            "language": info.language or "en",
+            "duration_sec": round(duration_sec, 2),
+        }) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
@@ -1,20 +1,47 @@
 """
-faster-whisper wrapper with singleton model loading.
-Load model once at startup, reuse across requests with a lock.
+faster-whisper wrapper with cached model loading.
+Load models once, keep the most recently used few, reuse across requests with a lock.
 """
 import os
 import threading
-from typing import Optional
+from collections import OrderedDict
+from typing import BinaryIO, Iterator, Optional, Union
 
-from faster_whisper import WhisperModel
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+from faster_whisper.audio import decode_audio
+from faster_whisper.transcribe import Segment, TranscriptionInfo
 
 ALLOWED_MODELS = ("base", "small", "medium", "large-v2", "large-v3")
+SAMPLE_RATE = 16000  # Whisper's expected input rate
 
-_model: Optional[WhisperModel] = None
+# (model_size, device, compute_type) -> model, least recently used first.
+_models: "OrderedDict[tuple[str, str, str], WhisperModel]" = OrderedDict()
 _model_lock = threading.Lock()
-_loaded_model_name: Optional[str] = None
-_loaded_device: Optional[str] = None
-_loaded_compute_type: Optional[str] = None
+_MAX_MODELS = max(1, int(os.environ.get("WHISPER_MODEL_CACHE", "2")))
+# Batched pipelines wrapping the cached models, same keys as _models.
+_pipelines: dict[tuple[str, str, str], BatchedInferencePipeline] = {}
+
+BATCH_SIZE = int(os.environ.get("WHISPER_BATCH", "8"))
+# Below this, batching has nothing to pack and single-stream is cheaper.
+BATCH_MIN_DURATION_SEC = 30.0
+# Longer silences merge speech into fewer, fuller 30s windows (fewer encoder passes).
+VAD_MIN_SILENCE_MS = int(os.environ.get("VAD_MIN_SILENCE_MS", "800"))
+CHUNK_LENGTH_SEC = 30
+# Clips this short have little to trim; the VAD pass costs more than it saves.
+VAD_MIN_DURATION_SEC = 5.0
+
+# CTranslate2 threading. 0 = use all cores. NUM_WORKERS is how many transcriptions
+# one loaded model runs in parallel; raise it instead of adding server processes,
+# which would each load their own copy of the weights.
+CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", "0"))
+NUM_WORKERS = int(os.environ.get("WHISPER_NUM_WORKERS", "1"))
+
+# Tried in order when the requested compute type is rejected by the device.
+_FALLBACK_COMPUTE_TYPES = {
+    "cuda": ("int8_float16", "float16", "int8", "float32"),
+    "cpu": ("int8", "float32"),
+}
 
 
 def get_model(
@@ -22,52 +49,147 @@ def get_model(
     device: Optional[str] = None,
     compute_type: Optional[str] = None,
 ) -> WhisperModel:
-    """Return singleton WhisperModel. Load once, reuse. Thread-safe."""
-    global _model, _loaded_model_name, _loaded_device, _loaded_compute_type
+    """Return cached WhisperModel for this config. Load once, reuse. Thread-safe."""
+    key = _cache_key(model_size, device, compute_type)
+    with _model_lock:
+        return _get_model_locked(key)
+
+
+def get_pipeline(
+    model_size: str = "small",
+    device: Optional[str] = None,
+    compute_type: Optional[str] = None,
+) -> BatchedInferencePipeline:
+    """Return cached BatchedInferencePipeline around the model for this config."""
+    key = _cache_key(model_size, device, compute_type)
+    with _model_lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is None:
+            pipeline = BatchedInferencePipeline(model=_get_model_locked(key))
+            _pipelines[key] = pipeline
+        return pipeline
 
+
+def _cache_key(
+    model_size: str,
+    device: Optional[str],
+    compute_type: Optional[str],
+) -> tuple[str, str, str]:
     if model_size not in ALLOWED_MODELS:
         raise ValueError(f"model must be one of {ALLOWED_MODELS}, got {model_size!r}")
-
     device = device or os.environ.get("WHISPER_DEVICE", "cpu")
-    if device == "cuda":
-        compute_type = compute_type or os.environ.get("WHISPER_COMPUTE_TYPE", "float16")
-    else:
-        compute_type = compute_type or os.environ.get("WHISPER_COMPUTE_TYPE", "int8")
+    # "auto" lets CTranslate2 pick the fastest type the device supports.
+    compute_type = compute_type or os.environ.get("WHISPER_COMPUTE_TYPE", "auto")
+    return (model_size, device, compute_type)
 
-    with _model_lock:
-        if (
-            _model is None
-            or _loaded_model_name != model_size
-            or _loaded_device != device
-            or _loaded_compute_type != compute_type
-        ):
-            _model = WhisperModel(
+
+def _get_model_locked(key: tuple[str, str, str]) -> WhisperModel:
+    """Look up or load the model for key. Caller must hold _model_lock."""
+    model = _models.get(key)
+    if model is not None:
+        _models.move_to_end(key)
+        return model
+    model_size, device, compute_type = key
+    model, resolved = _load_model(model_size, device, compute_type)
+    print(f"Whisper model {model_size} on {device} using compute_type={resolved}")
+    _models[key] = model
+    while len(_models) > _MAX_MODELS:
+        evicted, _ = _models.popitem(last=False)
+        _pipelines.pop(evicted, None)
+    return model
+
+
+def _load_model(model_size: str, device: str, compute_type: str) -> tuple[WhisperModel, str]:
+    """Construct WhisperModel, falling back to more widely supported compute types."""
+    candidates = [compute_type] + [
+        c for c in _FALLBACK_COMPUTE_TYPES.get(device, _FALLBACK_COMPUTE_TYPES["cpu"])
+        if c != compute_type
+    ]
+    last_error: Optional[ValueError] = None
+    for candidate in candidates:
+        try:
+            model = WhisperModel(
                 model_size,
                 device=device,
-                compute_type=compute_type,
+                compute_type=candidate,
+                cpu_threads=CPU_THREADS,
+                num_workers=NUM_WORKERS,
             )
-            _loaded_model_name = model_size
-            _loaded_device = device
-            _loaded_compute_type = compute_type
-        return _model
+            return model, candidate
+        except ValueError as e:
+            # Raised by CTranslate2 when the device/backend lacks the requested type.
+            print(f"compute_type={candidate} unsupported on {device}: {e}")
+            last_error = e
+    raise last_error
+
+
+def load_audio(audio: Union[str, BinaryIO, np.ndarray]) -> np.ndarray:
+    """
+    Decode audio once to 16kHz mono float32 PCM (in-process via PyAV).
+    Arrays are assumed already decoded and returned as-is.
+    """
+    if isinstance(audio, np.ndarray):
+        return audio
+    return decode_audio(audio, sampling_rate=SAMPLE_RATE)
+
+
+def transcribe_file_iter(
+    audio: Union[str, BinaryIO, np.ndarray],
+    language: Optional[str] = None,
+    model_size: str = "small",
+    batch_size: int = BATCH_SIZE,
+) -> tuple[Iterator[Segment], TranscriptionInfo]:
+    """
+    Start transcribing audio and return (segments, info) without consuming segments.
+    Segments are produced lazily as the model decodes; info (language, duration) is ready now.
+    Audio of BATCH_MIN_DURATION_SEC or longer is decoded in VAD-chunked batches of batch_size;
+    VAD is skipped for clips of VAD_MIN_DURATION_SEC or less.
+    """
+    pcm = load_audio(audio)
+    duration_sec = len(pcm) / SAMPLE_RATE
+    vad_parameters = dict(min_silence_duration_ms=VAD_MIN_SILENCE_MS, speech_pad_ms=100)
+    if batch_size > 1 and duration_sec >= BATCH_MIN_DURATION_SEC:
+        return get_pipeline(model_size=model_size).transcribe(
+            pcm,
+            language=language,
+            batch_size=batch_size,
+            vad_filter=True,
+            vad_parameters=vad_parameters,
+            # The pipeline defaults to one segment per VAD chunk (up to 30s); keep
+            # segments split on Whisper's timestamp tokens like the sequential path.
+            without_timestamps=False,
+        )
+    return get_model(model_size=model_size).transcribe(
+        pcm,
+        language=language,
+        chunk_length=CHUNK_LENGTH_SEC,
+        vad_filter=duration_sec > VAD_MIN_DURATION_SEC,
+        vad_parameters=vad_parameters,
+    )
+
+
+def segment_dict(s: Segment) -> dict:
+    """Serializable {"start", "end", "text"} view of a segment."""
+    return {"start": s.start, "end": s.end, "text": (s.text or "").strip()}
 
 
 def transcribe_file(
-    path: str,
+    audio: Union[str, BinaryIO, np.ndarray],
     language: Optional[str] = None,
     model_size: str = "small",
     include_timestamps: bool = False,
+    batch_size: int = BATCH_SIZE,
 ) -> tuple[str, Optional[str], float, list[dict]]:
     """
-    Transcribe audio file. Returns (text, detected_language, duration_sec, segments).
+    Transcribe audio (path, file-like, or 16kHz mono float32 array).
+    Returns (text, detected_language, duration_sec, segments).
     segments are [{"start": float, "end": float, "text": str}] if include_timestamps else [].
     """
-    model = get_model(model_size=model_size)
-    segments_iter, info = model.transcribe(
-        path,
+    segments_iter, info = transcribe_file_iter(
+        audio,
         language=language,
-        vad_filter=True,
-        vad_parameters=dict(min_silence_duration_ms=300, speech_pad_ms=100),
+        model_size=model_size,
+        batch_size=batch_size,
     )
     segments_list = list(segments_iter)
     text = " ".join(s.text for s in segments_list).strip()
@@ -77,10 +199,7 @@ def transcribe_file(
     duration_sec = float(duration_sec or 0.0)
     detected = info.language
     if include_timestamps:
-        segments = [
-            {"start": s.start, "end": s.end, "text": (s.text or "").strip()}
-            for s in segments_list
-        ]
+        segments = [segment_dict(s) for s in segments_list]
     else:
         segments = []
     return text, detected, duration_sec, segments
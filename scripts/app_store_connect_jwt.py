@@ -2,19 +2,26 @@
 """
 Generate a JWT for App Store Connect API using your .p8 auth key.
 Requires: pip install pyjwt cryptography
+Tokens are cached in ~/.cache/app_store_connect_jwt.json and reused until ~1 min before expiry.
 
 Usage:
   export APP_STORE_CONNECT_ISSUER_ID="your-issuer-id-uuid"
   python3 scripts/app_store_connect_jwt.py
   # Or with explicit key path:
   python3 scripts/app_store_connect_jwt.py /path/to/AuthKey_XXXXX.p8
+  # Keep the key loaded and serve tokens to later invocations (e.g. for a CI run):
+  python3 scripts/app_store_connect_jwt.py --daemon &
 """
+import json
 import os
+import socket
 import sys
+import time
 from pathlib import Path
 
 try:
     import jwt
+    from cryptography.hazmat.primitives import serialization
 except ImportError:
     print("Install: pip install pyjwt cryptography", file=sys.stderr)
     sys.exit(1)
@@ -27,7 +34,20 @@ ISSUER_ID = os.environ.get("APP_STORE_CONNECT_ISSUER_ID", "")
 # Default key path
 DEFAULT_KEY_PATH = Path.home() / "Downloads" / "AuthKey_MN2S8MNF4A.p8"
 
-USAGE = "Usage: python3 app_store_connect_jwt.py [key.p8] [ISSUER_ID]"
+USAGE = "Usage: python3 app_store_connect_jwt.py [--daemon] [key.p8] [ISSUER_ID]"
+
+# Last issued token, reused across invocations while it has CACHE_MIN_TTL seconds left
+CACHE_PATH = Path.home() / ".cache" / "app_store_connect_jwt.json"
+CACHE_MIN_TTL = 60
+
+# Unix socket served by --daemon; other invocations ask it for tokens when present
+SOCKET_PATH = Path("/tmp/ascjwt.sock")
+# Per-client timeout and request-line cap, so one bad client cannot block the daemon
+SOCKET_CLIENT_TIMEOUT = 2
+SOCKET_MAX_REQUEST = 1024
+
+# Parsed private keys by path, so repeated signing in one process skips PEM parsing
+_keys = {}
 
 
 def key_id_from_path(path: Path) -> str:
@@ -38,8 +58,135 @@ def key_id_from_path(path: Path) -> str:
     return DEFAULT_KEY_ID
 
 
+def load_private_key(key_path: Path):
+    """Parse the .p8 PEM once per process."""
+    key = _keys.get(key_path)
+    if key is None:
+        with open(key_path, "rb") as f:
+            key = serialization.load_pem_private_key(f.read(), password=None)
+        _keys[key_path] = key
+    return key
+
+
+def read_cached_token(key_id: str, issuer_id: str):
+    """Return the cached token if it matches kid/iss and is not about to expire."""
+    try:
+        with open(CACHE_PATH) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict):
+        return None
+    if cached.get("kid") != key_id or cached.get("iss") != issuer_id:
+        return None
+    if cached.get("exp", 0) - time.time() <= CACHE_MIN_TTL:
+        return None
+    return cached.get("token")
+
+
+def write_cached_token(key_id: str, issuer_id: str, exp: float, token: str):
+    """Store the token owner-readable only; a failed write just skips caching."""
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"kid": key_id, "iss": issuer_id, "exp": exp, "token": token}, f)
+    except OSError as e:
+        print(f"Could not write token cache {CACHE_PATH}: {e}", file=sys.stderr)
+
+
+def issue_token(key_path: Path, key_id: str, issuer_id: str):
+    """Sign a fresh token. Returns (token, exp)."""
+    private_key = load_private_key(key_path)
+
+    # Apple: ES256, aud appstoreconnect-v1, max 20 min expiry
+    now = int(time.time())
+    payload = {
+        "iss": issuer_id,
+        "iat": now,
+        "exp": now + 20 * 60,
+        "aud": "appstoreconnect-v1",
+    }
+    token = jwt.encode(
+        payload,
+        private_key,
+        algorithm="ES256",
+        headers={"kid": key_id},
+    )
+    if hasattr(token, "decode"):
+        token = token.decode("utf-8")
+    return token, payload["exp"]
+
+
+def request_daemon_token(key_id: str, issuer_id: str):
+    """Ask a running --daemon for a token. Returns None if no daemon can serve this key."""
+    if not SOCKET_PATH.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(2)
+            sock.connect(str(SOCKET_PATH))
+            sock.sendall(f"get-token {key_id} {issuer_id}\n".encode())
+            reply = sock.makefile("r").readline().strip()
+    except OSError:
+        return None
+    if not reply or reply.startswith("error"):
+        return None
+    return reply
+
+
+def serve_daemon(key_path: Path, key_id: str, issuer_id: str):
+    """Keep the parsed key in memory and answer get-token requests on SOCKET_PATH."""
+    load_private_key(key_path)
+    token, exp = None, 0
+    if SOCKET_PATH.exists():
+        # Only clear a stale socket; a path that still accepts belongs to a live daemon
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(str(SOCKET_PATH))
+            except ConnectionRefusedError:
+                SOCKET_PATH.unlink()
+            else:
+                print(f"A daemon is already serving on {SOCKET_PATH}", file=sys.stderr)
+                sys.exit(1)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(SOCKET_PATH))
+        os.chmod(SOCKET_PATH, 0o600)
+        server.listen()
+        print(f"Serving tokens for {key_id} on {SOCKET_PATH}", file=sys.stderr)
+        try:
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    # A client that stalls, hangs up early or sends garbage only
+                    # drops its own request
+                    try:
+                        conn.settimeout(SOCKET_CLIENT_TIMEOUT)
+                        line = conn.makefile("rb").readline(SOCKET_MAX_REQUEST)
+                        request = line.decode("utf-8", errors="replace").split()
+                        if request != ["get-token", key_id, issuer_id]:
+                            conn.sendall(b"error: unsupported request\n")
+                            continue
+                        if exp - time.time() <= CACHE_MIN_TTL:
+                            try:
+                                token, exp = issue_token(key_path, key_id, issuer_id)
+                            except Exception as e:
+                                print(f"Token signing failed: {e}", file=sys.stderr)
+                                conn.sendall(b"error: signing failed\n")
+                                continue
+                        conn.sendall(f"{token}\n".encode())
+                    except (OSError, ValueError):
+                        continue
+        except KeyboardInterrupt:
+            pass
+        finally:
+            SOCKET_PATH.unlink(missing_ok=True)
+
+
 def main():
     args = sys.argv[1:]
+    daemon = "--daemon" in args
+    args = [a for a in args if a != "--daemon"]
     key_path = Path(args[0]) if args and not args[0].startswith("-") else DEFAULT_KEY_PATH
     key_id = key_id_from_path(key_path)
     issuer_id = None
@@ -61,24 +208,17 @@ def main():
         print(USAGE, file=sys.stderr)
         sys.exit(1)
 
-    with open(key_path) as f:
-        private_key = f.read()
+    if daemon:
+        serve_daemon(key_path, key_id, issuer_id)
+        return
 
-    # Apple: ES256, aud appstoreconnect-v1, max 20 min expiry
-    payload = {
-        "iss": issuer_id,
-        "iat": __import__("time").time(),
-        "exp": __import__("time").time() + 20 * 60,
-        "aud": "appstoreconnect-v1",
-    }
-    token = jwt.encode(
-        payload,
-        private_key,
-        algorithm="ES256",
-        headers={"kid": key_id},
-    )
-    if hasattr(token, "decode"):
-        token = token.decode("utf-8")
+    token = request_daemon_token(key_id, issuer_id) or read_cached_token(key_id, issuer_id)
+    if token:
+        print(token)
+        return
+
+    token, exp = issue_token(key_path, key_id, issuer_id)
+    write_cached_token(key_id, issuer_id, exp, token)
     print(token)
 
 
@@ -30,12 +30,14 @@ def generate_app_icon():
     # Draw rounded rectangle with dark gray background
     rect = [rect_x, rect_y, rect_x + rect_width, rect_y + rect_height]
     
-    # Draw dark gray rounded rectangle
-    draw.rounded_rectangle(rect, radius=corner_radius, fill=(51, 51, 51))  # Dark gray
-    
-    # Draw subtle border (lighter gray outline)
-    border_color = (89, 89, 89, 153)  # Lighter gray with transparency
-    draw.rounded_rectangle(rect, radius=corner_radius, outline=(89, 89, 89), width=4)
+    # Draw dark gray rounded rectangle with subtle border (lighter gray outline)
+    draw.rounded_rectangle(
+        rect,
+        radius=corner_radius,
+        fill=(51, 51, 51),  # Dark gray
+        outline=(89, 89, 89),
+        width=4
+    )
     
     # Draw document icon
     icon_size = 280
@@ -10,6 +10,11 @@ try:
 except ImportError:
     raise SystemExit("Install Pillow: pip install Pillow")
 
+try:
+    import numpy as np
+except ImportError:
+    raise SystemExit("Install NumPy: pip install numpy")
+
 # Paths: image from Cursor assets; output next to script in workspace
 CURSOR_ASSETS = Path("/Users/danielphillippe/.cursor/projects/Users-danielphillippe-Desktop-FLYR-IOS/assets")
 SRC = CURSOR_ASSETS / "Screenshot_2026-02-13_at_3.17.54_PM-2c653827-5591-467e-9017-a84f9061c7c9.png"
@@ -19,12 +24,13 @@ OUT = Path(__file__).resolve().parent.parent / "session_summary_1920x1080_transp
 W, H = 1920, 1080
 
 # Checkerboard: treat pixels that are near these greys as transparent
-def is_checker_grey(r, g, b, a=255):
-    if a < 200:
-        return True
-    # Dark and mid greys (checkerboard tiles)
-    g_avg = (r + g + b) / 3
-    return 25 <= g_avg <= 120 and abs(r - g) <= 25 and abs(g - b) <= 25 and abs(r - b) <= 25
+def checker_grey_mask(arr):
+    """Boolean HxW mask of checkerboard pixels in an HxWx4 RGBA uint8 array."""
+    rgb = arr[..., :3].astype(np.int16)
+    # Dark and mid greys (checkerboard tiles): every channel pair within 25
+    g_avg = rgb.sum(axis=-1) / 3
+    spread = rgb.max(axis=-1) - rgb.min(axis=-1)
+    return (arr[..., 3] < 200) | ((g_avg >= 25) & (g_avg <= 120) & (spread <= 25))
 
 
 def main():
@@ -33,15 +39,11 @@ def main():
     OUT.parent.mkdir(parents=True, exist_ok=True)
 
     im = Image.open(SRC).convert("RGBA")
-    w, h = im.size
-    px = im.load()
 
     # Make checkerboard pixels transparent
-    for y in range(h):
-        for x in range(w):
-            r, g, b, a = px[x, y]
-            if is_checker_grey(r, g, b, a):
-                px[x, y] = (r, g, b, 0)
+    arr = np.array(im)
+    arr[checker_grey_mask(arr), 3] = 0
+    im = Image.fromarray(arr)
 
     # Crop to content bounds (optional: trim full-transparent rows/cols for scaling)
     bbox = im.getbbox()
@@ -58,7 +60,8 @@ def main():
     if new_h > H:
         scale = H / h
         new_w, new_h = int(w * scale), H
-    resized = im.resize((new_w, new_h), Image.Resampling.LANCZOS)
+    # reducing_gap: for large sources, box-reduce to ~2x target first, then LANCZOS
+    resized = im.resize((new_w, new_h), Image.Resampling.LANCZOS, reducing_gap=2.0)
     x0 = (W - new_w) // 2
     y0 = (H - new_h) // 2
     canvas.paste(resized, (x0, y0), resized)
@@ -10,59 +10,207 @@ Examples:
 """
 
 import argparse
+import gzip
+import http.client
+import io
+import itertools
 import json
+import os
+import re
 import sys
 import urllib.request
-import urllib.error
-from urllib.parse import urljoin
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urljoin, urlsplit
 
+try:
+    import orjson  # faster parsing of large GeoJSON responses
+except ImportError:
+    orjson = None
 
-def color(text, color_code):
-    """Add ANSI color codes to text."""
-    return f"\033[{color_code}m{text}\033[0m"
+try:
+    import ijson  # stream features one at a time instead of building the whole document
+except ImportError:
+    ijson = None
 
+PARSE_ERRORS = (json.JSONDecodeError, ijson.JSONError) if ijson else (json.JSONDecodeError,)
 
-def red(text): return color(text, 91)
-def green(text): return color(text, 92)
-def yellow(text): return color(text, 93)
-def blue(text): return color(text, 94)
-def magenta(text): return color(text, 95)
-def cyan(text): return color(text, 96)
+
+# Color only when writing to a terminal and NO_COLOR (no-color.org) is unset;
+# pipes and redirected logs get plain text
+USE_COLOR = sys.stdout.isatty() and os.environ.get('NO_COLOR') is None
+
+# ANSI escape sequences, built once
+RESET = "\033[0m"
+RED = "\033[91m"
+GREEN = "\033[92m"
+YELLOW = "\033[93m"
+BLUE = "\033[94m"
+MAGENTA = "\033[95m"
+CYAN = "\033[96m"
+
+
+def color(text, escape):
+    """Wrap text in a prebuilt ANSI escape sequence when color output is enabled."""
+    if not USE_COLOR:
+        return text
+    return f"{escape}{text}{RESET}"
+
+
+def red(text): return color(text, RED)
+def green(text): return color(text, GREEN)
+def yellow(text): return color(text, YELLOW)
+def blue(text): return color(text, BLUE)
+def magenta(text): return color(text, MAGENTA)
+def cyan(text): return color(text, CYAN)
+
+
+# Separator lines, colored once at import
+HEADER_RULE = cyan("═" * 65)
+SECTION_RULE = blue("─" * 65)
+SUMMARY_RULE = cyan("─" * 65)
+
+
+def header_lines(title):
+    return [HEADER_RULE, cyan(f"  {title}"), HEADER_RULE]
 
 
 def print_header(title):
-    print(cyan("═" * 65))
-    print(cyan(f"  {title}"))
-    print(cyan("═" * 65))
+    print(*header_lines(title), sep="\n")
 
 
 def print_section(title):
-    print(blue("─" * 65))
-    print(blue(f"  📡 {title}"))
-    print(blue("─" * 65))
+    print(SECTION_RULE, blue(f"  📡 {title}"), SECTION_RULE, sep="\n")
+
+
+def json_loads(body):
+    """Parse JSON with orjson when available, else stdlib json."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def json_pretty(data):
+    """Serialize to 2-space indented, key-sorted JSON with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS).decode('utf-8')
+    return json.dumps(data, indent=2, sort_keys=True)
+
 
+def json_outline(data):
+    """Top-level keys with at most the first feature, for previewing a large document."""
+    if isinstance(data, list):
+        return data[:1]
+    if not isinstance(data, dict):
+        return data
+    outline = {k: v for k, v in data.items() if k != 'features'}
+    features = data.get('features')
+    if 'features' in data:
+        outline['features'] = features[:1] if isinstance(features, list) else features
+    return outline
+
+
+BUILDINGS_ENDPOINT = "/api/campaigns/{campaign_id}/buildings"
+ROADS_ENDPOINT = "/api/campaigns/{campaign_id}/roads"
+
+# Above this many features (without --verbose), per-feature stats use a sample
+DEEP_SUMMARY_THRESHOLD = 10000
+SAMPLE_SIZE = 1000
+# Redirects are followed like urllib.request did, up to a small limit
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+# Below this many features, geometry types are tallied without a hash table
+SMALL_FEATURE_COUNT = 64
+# A document whose top-level "features" is an empty array. Anchored at the opening
+# brace and only allowing scalar-valued keys before it, so a nested "features"
+# (inside an object or array) never matches; anything else is parsed normally.
+EMPTY_TOP_LEVEL_FEATURES = re.compile(
+    rb'\s*\{(?:\s*"[^"\\]*"\s*:\s*(?:"[^"\\]*"|[-+.\w]+)\s*,)*'
+    rb'\s*"features"\s*:\s*\[\s*\]'
+)
 
-def make_request(url, timeout=30):
-    """Make HTTP request and return (status_code, body, error)."""
+
+def open_connection(split, timeout=30):
+    """Open a keep-alive connection to the API host from a pre-split base URL.
+    
+    HTTPS goes through a CONNECT tunnel when HTTPS_PROXY is set (honouring
+    NO_PROXY), as urllib.request did. Plain-HTTP base URLs (local development)
+    always connect directly.
+    """
+    if split.scheme == 'https':
+        proxy = urllib.request.getproxies().get('https')
+        if proxy and not urllib.request.proxy_bypass(split.hostname):
+            proxy_split = urlsplit(proxy)
+            conn = http.client.HTTPSConnection(proxy_split.hostname, proxy_split.port, timeout=timeout)
+            conn.set_tunnel(split.hostname, split.port)
+            return conn
+        return http.client.HTTPSConnection(split.hostname, split.port, timeout=timeout)
+    return http.client.HTTPConnection(split.hostname, split.port, timeout=timeout)
+
+
+def make_request(conn, path):
+    """GET path over conn, following redirects, and return (status_code, body bytes, error).
+    
+    A redirect to another host is followed on a short-lived connection of its own.
+    """
+    redirect_conn = None
     try:
-        req = urllib.request.Request(url, method='GET')
-        req.add_header('Accept', 'application/json')
-        
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            body = response.read().decode('utf-8')
-            return response.status, body, None
-    except urllib.error.HTTPError as e:
-        body = e.read().decode('utf-8') if e.fp else ""
-        return e.code, body, None
-    except urllib.error.URLError as e:
-        return 0, "", str(e.reason)
-    except Exception as e:
-        return 0, "", str(e)
-
-
-def analyze_geojson(data, verbose=False):
-    """Analyze GeoJSON FeatureCollection and return summary."""
+        for _ in range(MAX_REDIRECTS + 1):
+            status, location, body, error = send_request(conn, path)
+            if error or status not in REDIRECT_STATUSES or not location:
+                return status, body, error
+            target = urlsplit(urljoin(path, location))
+            if target.netloc:
+                if redirect_conn is not None:
+                    redirect_conn.close()
+                conn = redirect_conn = open_connection(target)
+            path = (target.path or '/') + (f"?{target.query}" if target.query else "")
+        return status, body, f"Too many redirects (last: {location})"
+    finally:
+        if redirect_conn is not None:
+            redirect_conn.close()
+
+
+def send_request(conn, path):
+    """Send one GET over conn and return (status_code, Location header, body bytes, error)."""
+    headers = {
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip',
+        'Connection': 'keep-alive',
+    }
+    for attempt in range(2):
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            # Raw bytes: the JSON parsers accept them directly, no decode pass needed
+            body = read_body(response)
+            return response.status, response.getheader('Location'), body, None
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+            # Server closed the kept-alive connection; reconnect and retry once
+            conn.close()
+            if attempt:
+                return 0, None, b"", str(e)
+        except Exception as e:
+            conn.close()
+            return 0, None, b"", str(e)
+
+
+def read_body(response):
+    """Read a response body, decompressing it while reading if the server sent gzip."""
+    if response.headers.get('Content-Encoding') == 'gzip':
+        with gzip.GzipFile(fileobj=response) as gz:
+            return gz.read()
+    return response.read()
+
+
+def preview(body, limit):
+    """Decode the first `limit` bytes of a response body for display."""
+    return body[:limit].decode('utf-8', 'replace')
+
+
+def quick_summary(data):
+    """Validate the FeatureCollection shape and count features without touching them."""
     if not isinstance(data, dict):
         return {"error": "Response is not a JSON object"}
     
@@ -77,51 +225,165 @@ def analyze_geojson(data, verbose=False):
     
     feature_count = len(features)
     
-    result = {
+    return {
         "type": geojson_type,
         "feature_count": feature_count,
         "empty": feature_count == 0
     }
-    
-    if feature_count > 0:
-        # Analyze first feature
-        first = features[0]
-        geom_type = first.get('geometry', {}).get('type', 'unknown') if isinstance(first.get('geometry'), dict) else 'none'
-        props = first.get('properties', {}) if isinstance(first.get('properties'), dict) else {}
-        
-        result['first_feature'] = {
-            "geometry_type": geom_type,
-            "has_id": 'id' in first,
-            "has_gers_id": 'gers_id' in props,
-            "sample_properties": {k: v for k, v in list(props.items())[:5]}
-        }
-        
-        # Count geometry types
-        geom_types = {}
+
+
+def first_feature_info(first):
+    """Summarize the first feature for display."""
+    geom_type = first.get('geometry', {}).get('type', 'unknown') if isinstance(first.get('geometry'), dict) else 'none'
+    props = first.get('properties', {}) if isinstance(first.get('properties'), dict) else {}
+    
+    return {
+        "geometry_type": geom_type,
+        "has_id": 'id' in first,
+        "has_gers_id": 'gers_id' in props,
+        "sample_properties": {k: v for k, v in list(props.items())[:5]}
+    }
+
+
+def feature_stats(features):
+    """Count geometry types and features with gers_id in a single pass over any iterable.
+    
+    geometry_types is returned as a list of (type, count) pairs.
+    """
+    gers_count = 0
+    
+    def geometry_types():
+        nonlocal gers_count
+        # Features are plain dicts from the JSON parser, so an exact type check
+        # against a local binding replaces isinstance() plus a global lookup
+        dict_type = dict
         for f in features:
-            gt = f.get('geometry', {}).get('type', 'unknown') if isinstance(f.get('geometry'), dict) else 'none'
-            geom_types[gt] = geom_types.get(gt, 0) + 1
-        result['geometry_types'] = geom_types
-        
-        # Check for gers_id in all features
-        gers_count = sum(1 for f in features if isinstance(f.get('properties'), dict) and f['properties'].get('gers_id'))
-        result['features_with_gers_id'] = gers_count
+            # GeoJSON features carry both keys, so subscript directly and only
+            # fall back to .get() for the rare feature missing one
+            try:
+                props = f['properties']
+                geom = f['geometry']
+            except KeyError:
+                props = f.get('properties')
+                geom = f.get('geometry')
+            if type(props) is dict_type and props.get('gers_id'):
+                gers_count += 1
+            yield geom.get('type', 'unknown') if type(geom) is dict_type else 'none'
+    
+    if isinstance(features, list) and len(features) < SMALL_FEATURE_COUNT:
+        # Few features (typical test campaigns): a linear scan over a handful of
+        # pairs is cheaper than allocating and hashing into a Counter
+        pairs = []
+        for gt in geometry_types():
+            for pair in pairs:
+                if pair[0] == gt:
+                    pair[1] += 1
+                    break
+            else:
+                pairs.append([gt, 1])
+        geom_types = [(gt, count) for gt, count in pairs]
+    else:
+        # Counter tallies in C rather than a Python-level dict.get/store per feature
+        geom_types = list(Counter(geometry_types()).items())
+    return {
+        "geometry_types": geom_types,
+        "features_with_gers_id": gers_count,
+        "analyzed_count": sum(count for _, count in geom_types),
+    }
+
+
+def deep_summary(features, verbose=False, sample_limit=None):
+    """Per-feature statistics for a non-empty features list.
+    
+    With sample_limit, geometry types and gers_id are counted over only the
+    first sample_limit features.
+    """
+    sample = features if sample_limit is None else features[:sample_limit]
+    result = {"first_feature": first_feature_info(features[0])}
+    result.update(feature_stats(sample))
+    
+    if verbose:
+        result['sample_feature'] = features[0]
+    
+    return result
+
+
+def stream_summary(body):
+    """quick_summary + deep_summary computed by streaming the body with ijson.
+    
+    Features are materialized one at a time (at most SAMPLE_SIZE are held), so
+    memory stays flat however large the snapshot is. Stats cover the same
+    features as the parsed path: all of them up to DEEP_SUMMARY_THRESHOLD,
+    else only the first SAMPLE_SIZE. Raises ijson.JSONError on malformed JSON.
+    """
+    events = ijson.parse(io.BytesIO(body))
+    first_event = next(events, None)
+    if first_event is None or first_event[1] != 'start_map':
+        return {"error": "Response is not a JSON object"}
     
-    if verbose and feature_count > 0:
-        result['sample_feature'] = features[0] if feature_count > 0 else None
+    # Read up to the start of the top-level 'features' value to learn its kind,
+    # picking up 'type' on the way if it comes first
+    geojson_type = 'unknown'
+    features_event = None
+    for prefix, event, value in events:
+        if prefix == 'type' and event == 'string':
+            geojson_type = value
+        elif prefix == 'features':
+            features_event = event
+            break
+    
+    # 'type' is only reported for invalid documents; if it follows a non-array
+    # 'features', keep reading for it (an array is never scanned past here)
+    if features_event is not None and features_event != 'start_array' and geojson_type == 'unknown':
+        for prefix, event, value in events:
+            if prefix == 'type' and event == 'string':
+                geojson_type = value
+                break
+    
+    if features_event is None or features_event == 'null':
+        return {"error": "Missing 'features' array", "type": geojson_type}
     
+    if features_event != 'start_array':
+        return {"error": "'features' is not an array", "type": geojson_type}
+    
+    features = ijson.items(io.BytesIO(body), 'features.item', use_float=True)
+    sample = list(itertools.islice(features, SAMPLE_SIZE))
+    if not sample:
+        return {"type": geojson_type, "feature_count": 0, "empty": True}
+    
+    stats = feature_stats(sample)
+    feature_count = len(sample)
+    if feature_count == SAMPLE_SIZE:
+        # The total is only known at the end: tally features up to the threshold
+        # separately, then just count the rest
+        rest = feature_stats(itertools.islice(features, DEEP_SUMMARY_THRESHOLD - SAMPLE_SIZE))
+        feature_count += rest['analyzed_count'] + sum(1 for _ in features)
+        if feature_count <= DEEP_SUMMARY_THRESHOLD:
+            geom_types = dict(stats['geometry_types'])
+            for gt, count in rest['geometry_types']:
+                geom_types[gt] = geom_types.get(gt, 0) + count
+            stats = {
+                "geometry_types": list(geom_types.items()),
+                "features_with_gers_id": stats['features_with_gers_id'] + rest['features_with_gers_id'],
+                "analyzed_count": feature_count,
+            }
+    
+    result = {"type": geojson_type, "first_feature": first_feature_info(sample[0])}
+    result.update(stats)
+    result['feature_count'] = feature_count
+    result['empty'] = False
     return result
 
 
-def test_buildings_endpoint(base_url, campaign_id, verbose=False):
-    """Test the buildings API endpoint."""
-    endpoint = f"/api/campaigns/{campaign_id}/buildings"
-    url = urljoin(base_url, endpoint)
+def test_buildings_endpoint(response, origin, campaign_id, verbose=False):
+    """Report on the buildings API endpoint from its (status, body, error) response."""
+    endpoint = BUILDINGS_ENDPOINT.format(campaign_id=campaign_id)
+    url = f"{origin}{endpoint}"
     
     print_section(f"GET {endpoint}")
     print(f"Full URL: {url}\n")
     
-    status, body, error = make_request(url)
+    status, body, error = response
     
     print(f"HTTP Status: {status if status else 'Connection Failed'}")
     
@@ -139,25 +401,37 @@ def test_buildings_endpoint(base_url, campaign_id, verbose=False):
     
     if status != 200:
         print(yellow(f"⚠️  Unexpected status: {status}"))
-        print(f"Response: {body[:500]}")
+        print(f"Response: {preview(body, 500)}")
         return {"status": "error", "http_status": status}
     
-    # Parse JSON
-    try:
-        data = json.loads(body)
-    except json.JSONDecodeError as e:
-        print(red(f"❌ Invalid JSON response: {e}"))
-        print(f"Raw response (first 500 chars): {body[:500]}")
-        return {"status": "parse_error"}
-    
-    # Analyze GeoJSON
-    analysis = analyze_geojson(data, verbose)
+    # Without --verbose the document itself is never printed. An empty top-level
+    # features array (the case this script diagnoses) is recognized from the raw
+    # bytes without parsing; otherwise stream with ijson when installed instead
+    # of building the document in memory.
+    empty_bytes = not verbose and EMPTY_TOP_LEVEL_FEATURES.match(body) is not None
+    streaming = ijson is not None and not verbose and not empty_bytes
+    if empty_bytes:
+        analysis = {"feature_count": 0, "empty": True}
+    else:
+        try:
+            if streaming:
+                analysis = stream_summary(body)
+            else:
+                data = json_loads(body)
+        except PARSE_ERRORS as e:
+            print(red(f"❌ Invalid JSON response: {e}"))
+            print(f"Raw response (first 500 chars): {preview(body, 500)}")
+            return {"status": "parse_error"}
+        
+        # Validate shape and count first; per-feature stats only if there are features
+        if not streaming:
+            analysis = quick_summary(data)
     
     if "error" in analysis:
         print(red(f"❌ Invalid GeoJSON: {analysis['error']}"))
         print(f"Type: {analysis.get('type', 'unknown')}")
         if verbose:
-            print(f"\nRaw response:\n{json.dumps(data, indent=2)[:2000]}")
+            print(f"\nRaw response:\n{json_pretty(json_outline(data))[:2000]}")
         return {"status": "invalid_geojson", "error": analysis['error']}
     
     print(green(f"✅ Valid GeoJSON FeatureCollection"))
@@ -173,13 +447,22 @@ def test_buildings_endpoint(base_url, campaign_id, verbose=False):
         print("  5. Lambda query returned no results for the polygon")
         
         if verbose:
-            print(f"\nRaw response:\n{json.dumps(data, indent=2)}")
+            print(f"\nRaw response:\n{json_pretty(data)}")
         
         return {"status": "empty", "feature_count": 0}
     
     # Success - has features
     print(green(f"\n✅ SUCCESS - {analysis['feature_count']} building(s) found"))
     
+    if not streaming:
+        # Huge snapshots: sample the first features unless --verbose asks for everything
+        sample_limit = None
+        if not verbose and analysis['feature_count'] > DEEP_SUMMARY_THRESHOLD:
+            sample_limit = SAMPLE_SIZE
+        analysis.update(deep_summary(data['features'], verbose, sample_limit))
+    analyzed = analysis['analyzed_count']
+    sampled_note = f" (first {analyzed} features)" if analyzed < analysis['feature_count'] else ""
+    
     first = analysis.get('first_feature', {})
     print(f"\nFirst feature:")
     print(f"  Geometry type: {first.get('geometry_type', 'unknown')}")
@@ -187,27 +470,26 @@ def test_buildings_endpoint(base_url, campaign_id, verbose=False):
     print(f"  Has gers_id: {first.get('has_gers_id', False)}")
     
     if 'geometry_types' in analysis:
-        print(f"\nGeometry type distribution:")
-        for gt, count in analysis['geometry_types'].items():
+        print(f"\nGeometry type distribution{sampled_note}:")
+        for gt, count in analysis['geometry_types']:
             print(f"  {gt}: {count}")
     
     if 'features_with_gers_id' in analysis:
-        print(f"\nFeatures with gers_id: {analysis['features_with_gers_id']}/{analysis['feature_count']}")
+        print(f"\nFeatures with gers_id: {analysis['features_with_gers_id']}/{analyzed}{sampled_note}")
     
     if verbose and 'sample_feature' in analysis:
-        print(f"\nSample feature:\n{json.dumps(analysis['sample_feature'], indent=2)}")
+        print(f"\nSample feature:\n{json_pretty(analysis['sample_feature'])}")
     
     return {"status": "success", "feature_count": analysis['feature_count']}
 
 
-def test_roads_endpoint(base_url, campaign_id):
-    """Test the roads API endpoint (optional)."""
-    endpoint = f"/api/campaigns/{campaign_id}/roads"
-    url = urljoin(base_url, endpoint)
+def test_roads_endpoint(response, campaign_id):
+    """Report on the roads API endpoint (optional) from its (status, body, error) response."""
+    endpoint = ROADS_ENDPOINT.format(campaign_id=campaign_id)
     
     print_section(f"GET {endpoint} (optional)")
     
-    status, body, error = make_request(url)
+    status, body, error = response
     
     print(f"HTTP Status: {status if status else 'Connection Failed'}")
     
@@ -221,7 +503,7 @@ def test_roads_endpoint(base_url, campaign_id):
     
     if status == 200:
         try:
-            data = json.loads(body)
+            data = json_loads(body)
             features = data.get('features', [])
             print(f"Roads features: {len(features)}")
             if len(features) > 0:
@@ -234,43 +516,12 @@ def test_roads_endpoint(base_url, campaign_id):
             print("⚠️  Invalid JSON from roads endpoint")
             return {"status": "parse_error"}
     
-    print(f"Response: {body[:200]}")
+    print(f"Response: {preview(body, 200)}")
     return {"status": "error", "http_status": status}
 
 
-def print_summary(buildings_result, roads_result, campaign_id):
-    """Print summary and next steps."""
-    print_header("Summary & Next Steps")
-    
-    print("\nBuildings API Result:")
-    status = buildings_result.get('status')
-    
-    if status == 'success':
-        print(green(f"  ✅ {buildings_result['feature_count']} building(s) available"))
-    elif status == 'empty':
-        print(red("  ❌ Buildings snapshot is EMPTY"))
-    elif status == 'not_found':
-        print(yellow("  ⚠️  Buildings snapshot not found (404)"))
-    else:
-        print(red(f"  ❌ Error: {buildings_result.get('error', status)}"))
-    
-    print("\nRoads API Result:")
-    rstatus = roads_result.get('status')
-    if rstatus == 'success':
-        print(green(f"  ✅ {roads_result['feature_count']} road(s) available - snapshot set exists"))
-    elif rstatus == 'empty':
-        print("  ℹ️  Roads empty but endpoint exists")
-    elif rstatus == 'not_found':
-        print("  ℹ️  Roads endpoint not available (optional)")
-    else:
-        print("  ⚠️  Could not verify roads")
-    
-    print("\n" + cyan("─" * 65))
-    
-    # Diagnostic guidance
-    if status == 'empty' and rstatus == 'success':
-        print(yellow("\n🔍 DIAGNOSIS: Buildings empty but roads exist"))
-        print("""
+# Diagnostic guidance for print_summary; <campaign_id> is a literal placeholder
+DIAG_EMPTY_ROADS_OK = """
 This means:
   • The campaign_snapshots row EXISTS (roads work)
   • But the buildings snapshot file is empty or corrupted
@@ -282,10 +533,9 @@ Check in Supabase:
 Check S3 directly:
   aws s3 ls s3://flyr-snapshots/campaigns/<campaign_id>/
   aws s3 cp s3://flyr-snapshots/campaigns/<campaign_id>/buildings.geojson.gz - | gunzip | jq '.features | length'
-""")
-    elif status == 'empty' and rstatus == 'not_found':
-        print(yellow("\n🔍 DIAGNOSIS: Buildings empty, roads endpoint unavailable"))
-        print("""
+"""
+
+DIAG_EMPTY_NO_ROADS = """
 This means:
   • Campaign may exist but not be fully provisioned
   • Or snapshot exists but both buildings and roads are empty
@@ -299,10 +549,9 @@ If provision_status != 'ready':
   
 If provision_status = 'ready':
   → Check campaign_snapshots table for metadata
-""")
-    elif status == 'not_found':
-        print(yellow("\n🔍 DIAGNOSIS: Buildings endpoint returned 404"))
-        print("""
+"""
+
+DIAG_NOT_FOUND = """
 This means:
   • Campaign does not exist, OR
   • Campaign exists but has no snapshot metadata, OR
@@ -317,20 +566,63 @@ If no rows found:
   
 If found but provision_status is null/pending:
   → Campaign needs provisioning (POST /api/campaigns/provision)
-""")
+"""
+
+
+def print_summary(buildings_result, roads_result, campaign_id):
+    """Print summary and next steps in a single write."""
+    lines = header_lines("Summary & Next Steps")
     
-    print(cyan("─" * 65))
-    print("\nUseful Supabase queries:")
-    print("  -- Check campaign status")
-    print(f"  SELECT id, provision_status, territory_boundary IS NOT NULL as has_boundary")
-    print(f"  FROM campaigns WHERE id = '{campaign_id}';\n")
+    lines.append("\nBuildings API Result:")
+    status = buildings_result.get('status')
     
-    print("  -- Check snapshot metadata")
-    print(f"  SELECT campaign_id, buildings_key, addresses_key, created_at")
-    print(f"  FROM campaign_snapshots WHERE campaign_id = '{campaign_id}';\n")
+    if status == 'success':
+        lines.append(green(f"  ✅ {buildings_result['feature_count']} building(s) available"))
+    elif status == 'empty':
+        lines.append(red("  ❌ Buildings snapshot is EMPTY"))
+    elif status == 'not_found':
+        lines.append(yellow("  ⚠️  Buildings snapshot not found (404)"))
+    else:
+        lines.append(red(f"  ❌ Error: {buildings_result.get('error', status)}"))
     
-    print("  -- Check provision logs (if available)")
-    print(f"  SELECT * FROM provision_logs WHERE campaign_id = '{campaign_id}' ORDER BY created_at DESC LIMIT 5;")
+    lines.append("\nRoads API Result:")
+    rstatus = roads_result.get('status')
+    if rstatus == 'success':
+        lines.append(green(f"  ✅ {roads_result['feature_count']} road(s) available - snapshot set exists"))
+    elif rstatus == 'empty':
+        lines.append("  ℹ️  Roads empty but endpoint exists")
+    elif rstatus == 'not_found':
+        lines.append("  ℹ️  Roads endpoint not available (optional)")
+    else:
+        lines.append("  ⚠️  Could not verify roads")
+    
+    lines.append("\n" + SUMMARY_RULE)
+    
+    # Diagnostic guidance
+    if status == 'empty' and rstatus == 'success':
+        lines.append(yellow("\n🔍 DIAGNOSIS: Buildings empty but roads exist"))
+        lines.append(DIAG_EMPTY_ROADS_OK)
+    elif status == 'empty' and rstatus == 'not_found':
+        lines.append(yellow("\n🔍 DIAGNOSIS: Buildings empty, roads endpoint unavailable"))
+        lines.append(DIAG_EMPTY_NO_ROADS)
+    elif status == 'not_found':
+        lines.append(yellow("\n🔍 DIAGNOSIS: Buildings endpoint returned 404"))
+        lines.append(DIAG_NOT_FOUND)
+    
+    lines.append(SUMMARY_RULE)
+    lines.append("\nUseful Supabase queries:")
+    lines.append("  -- Check campaign status")
+    lines.append(f"  SELECT id, provision_status, territory_boundary IS NOT NULL as has_boundary")
+    lines.append(f"  FROM campaigns WHERE id = '{campaign_id}';\n")
+    
+    lines.append("  -- Check snapshot metadata")
+    lines.append(f"  SELECT campaign_id, buildings_key, addresses_key, created_at")
+    lines.append(f"  FROM campaign_snapshots WHERE campaign_id = '{campaign_id}';\n")
+    
+    lines.append("  -- Check provision logs (if available)")
+    lines.append(f"  SELECT * FROM provision_logs WHERE campaign_id = '{campaign_id}' ORDER BY created_at DESC LIMIT 5;")
+    
+    print("\n".join(lines))
 
 
 def main():
@@ -352,14 +644,41 @@ Examples:
     
     args = parser.parse_args()
     
+    # Parse the base URL once; endpoints are absolute paths on its origin
+    split = urlsplit(args.base_url)
+    try:
+        split.port  # raises ValueError for a non-numeric or out-of-range port
+    except ValueError:
+        split = None
+    if split is None or split.scheme not in ('http', 'https') or not split.hostname:
+        parser.error(f"--base-url must be an http:// or https:// URL, got {args.base_url!r}")
+    origin = f"{split.scheme}://{split.netloc}"
+    
     print_header("🏢 Buildings API Diagnostic Tool")
     print(f"Campaign ID: {args.campaign_id}")
     print(f"Base URL:    {args.base_url}")
     print(f"Time:        {datetime.now().isoformat()}\n")
     
+    # Fetch both endpoints concurrently (one connection each; http.client
+    # connections are not thread-safe), then report in a fixed order
+    buildings_conn = open_connection(split)
+    roads_conn = open_connection(split)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        buildings_future = pool.submit(
+            make_request, buildings_conn, BUILDINGS_ENDPOINT.format(campaign_id=args.campaign_id)
+        )
+        roads_future = pool.submit(
+            make_request, roads_conn, ROADS_ENDPOINT.format(campaign_id=args.campaign_id)
+        )
+        buildings_response = buildings_future.result()
+        roads_response = roads_future.result()
+    buildings_conn.close()
+    roads_conn.close()
+    
     # Test buildings
     buildings_result = test_buildings_endpoint(
-        args.base_url, 
+        buildings_response,
+        origin, 
         args.campaign_id, 
         args.verbose
     )
@@ -367,7 +686,7 @@ Examples:
     print()
     
     # Test roads
-    roads_result = test_roads_endpoint(args.base_url, args.campaign_id)
+    roads_result = test_roads_endpoint(roads_response, args.campaign_id)
     
     print()
     